@@ -1,10 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import folium
 from folium import plugins
-from streamlit_folium import st_folium
+import streamlit.components.v1 as components
 import snowflake.connector
-import json
+import orjson
+import hashlib
+import time
+from pathlib import Path
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
 from branca.colormap import LinearColormap
 
 # Page configuration
@@ -22,6 +29,39 @@ This interactive dashboard identifies underserved areas for new gym locations in
 by analyzing gym density, demographics, and accessibility metrics.
 """)
 
+# Local Parquet mirror of the Snowflake tables, refreshed once it is older than the TTL
+MIRROR_DIR = Path(__file__).parent / '.cache'
+MIRROR_TTL_SECONDS = 3600
+
+# Numeric columns whose min/max bound the sidebar sliders and map color scales
+METRIC_COLUMNS = [
+    'total_population',
+    'gyms_within_half_mile',
+    'distance_to_nearest_gym_miles',
+    'opportunity_score'
+]
+
+# List of census blocks that extend into water (identified by abnormally large area)
+WATER_OVERLAPPING_BLOCKS = ['060750179021', '060750601001']
+
+# Popup shown for each census block, filled from a row of the mart with str.format_map
+POPUP_TEMPLATE = """
+<div style="font-family: Arial; width: 250px;">
+    <h4>Census Block: {census_block_group}</h4>
+    <hr>
+    <b>Opportunity Tier:</b> {opportunity_tier}<br>
+    <b>Population:</b> {total_population:,.0f}<br>
+    <b>Gyms (0.5mi):</b> {gyms_within_half_mile}<br>
+    <b>Gyms (1mi):</b> {gyms_within_1_mile}<br>
+    <b>Nearest Gym:</b> {distance_to_nearest_gym_miles:.2f} miles<br>
+    <b>Accessibility:</b> {accessibility_rating}<br>
+    <hr>
+    <b>Median Income:</b> ${median_household_income:,.0f}<br>
+    <b>Working Age Pop:</b> {pop_age_18_54:,.0f}<br>
+    <b>Opportunity Score:</b> {opportunity_score:,.0f}
+</div>
+"""
+
 @st.cache_resource
 def get_snowflake_connection():
     """Create Snowflake connection using connection parameters from snow CLI"""
@@ -49,18 +89,15 @@ def get_snowflake_connection():
     )
     return conn
 
-@st.cache_data(ttl=3600)
-def load_gym_data():
-    """Load gym accessibility data from Snowflake"""
-    conn = get_snowflake_connection()
-
-    query = """
+# Snowflake queries mirrored locally, keyed by the table name they are exposed as in DuckDB
+MIRROR_QUERIES = {
+    'mart_gym_accessibility': f"""
     SELECT
         census_block_group,
         state,
         county,
-        ST_ASGEOJSON(geography) as geometry,
-        geometry_json,
+        -- Simplify boundaries (tolerance in meters for GEOGRAPHY) to cut vertices sent to the browser
+        ST_ASGEOJSON(ST_SIMPLIFY(geography, 5)) as geometry,
         total_population,
         pop_age_18_54,
         pct_prime_gym_age,
@@ -75,82 +112,362 @@ def load_gym_data():
         accessibility_rating,
         is_underserved,
         opportunity_score,
-        opportunity_tier
+        opportunity_tier,
+        -- Flag water-overlapping blocks once here so the filter only tests a boolean column
+        census_block_group IN ({', '.join(repr(block) for block in WATER_OVERLAPPING_BLOCKS)}) as is_water_overlap
     FROM mart_gym_accessibility
-    ORDER BY opportunity_score DESC
+    """,
+    'int_sf_gyms': """
+    SELECT
+        place_id,
+        display_name,
+        gym_type,
+        ST_X(geography) as longitude,
+        ST_Y(geography) as latitude
+    FROM LEAP_ANALYTICS.DEV_INTERMEDIATE.INT_SF_GYMS
     """
+}
+
+# Mirror files are named after a hash of the queries, so changing a query forces a fresh download
+MIRROR_VERSION = hashlib.sha256(repr(MIRROR_QUERIES).encode()).hexdigest()[:12]
 
-    df = pd.read_sql(query, conn)
+def get_mirror_path(table):
+    """Path of a table's Parquet file in the local mirror for the current queries"""
+    return MIRROR_DIR / f'{table}_{MIRROR_VERSION}.parquet'
+
+def refresh_mirror():
+    """Fetch every mirrored table from Snowflake and write it to the local Parquet mirror"""
+    conn = get_snowflake_connection()
     # Don't close connection - it's cached and will be reused
 
-    # Snowflake returns columns in uppercase - convert to lowercase for consistency
-    df.columns = df.columns.str.lower()
+    # Submit all queries up front so the warehouse runs them concurrently
+    query_ids = {}
+    for table, query in MIRROR_QUERIES.items():
+        with conn.cursor() as cur:
+            cur.execute_async(query)
+            query_ids[table] = cur.sfqid
+
+    MIRROR_DIR.mkdir(parents=True, exist_ok=True)
+    for table, query_id in query_ids.items():
+        # Waits for the query to finish, then fetches its result through the Arrow format
+        with conn.cursor() as cur:
+            cur.get_results_from_sfqid(query_id)
+            # Unifies the per-batch integer widths and handles empty results
+            df = cur.fetch_pandas_all()
+
+        # Snowflake returns columns in uppercase - convert to lowercase for consistency
+        df.columns = df.columns.str.lower()
+
+        # Write to a temporary file first so readers never see a partial mirror
+        path = get_mirror_path(table)
+        tmp_path = path.with_suffix('.tmp')
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+        tmp_path.replace(path)
+
+        # Drop files written for earlier versions of the queries
+        for old_path in MIRROR_DIR.glob(f'{table}*.parquet'):
+            if old_path != path:
+                old_path.unlink(missing_ok=True)
+
+@st.cache_resource(ttl=MIRROR_TTL_SECONDS)
+def get_mirror_database():
+    """Open an in-memory DuckDB database over the local mirror of the Snowflake tables"""
+    paths = {table: get_mirror_path(table) for table in MIRROR_QUERIES}
+    if any(not path.exists() or time.time() - path.stat().st_mtime > MIRROR_TTL_SECONDS
+           for path in paths.values()):
+        refresh_mirror()
+
+    db = duckdb.connect()
+    for table, path in paths.items():
+        escaped_path = str(path).replace("'", "''")
+        db.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{escaped_path}')")
+    return db
+
+def query_mirror(query, params=None):
+    """Run a query against the local DuckDB mirror of the Snowflake tables"""
+    # DuckDB connections aren't thread-safe - give each rerun its own cursor
+    with get_mirror_database().cursor() as cur:
+        return cur.execute(query, params).df()
+
+def build_filter_clause(tiers, min_pop, max_dist, exclude_water):
+    """Build the WHERE clause and bind parameters for the sidebar filters"""
+    params = {
+        'tiers': list(tiers),
+        'min_pop': min_pop,
+        'max_dist': max_dist
+    }
+    conditions = [
+        "list_contains($tiers::VARCHAR[], opportunity_tier)",
+        "total_population >= $min_pop",
+        "distance_to_nearest_gym_miles <= $max_dist"
+    ]
+
+    # Optionally exclude water-overlapping blocks
+    if exclude_water:
+        conditions.append("NOT is_water_overlap")
+
+    return "WHERE " + "\n        AND ".join(conditions), params
+
+@st.cache_data(ttl=3600)
+def load_filter_options():
+    """Load the values needed to build the sidebar filters"""
+    # List tiers from highest to lowest opportunity, ranked by their best score
+    query = """
+    SELECT
+        LIST(opportunity_tier ORDER BY max_opportunity_score DESC) as opportunity_tiers,
+        SUM(census_blocks)::BIGINT as total_census_blocks
+    FROM (
+        SELECT
+            opportunity_tier,
+            MAX(opportunity_score) as max_opportunity_score,
+            COUNT(*) as census_blocks
+        FROM mart_gym_accessibility
+        GROUP BY opportunity_tier
+    )
+    """
+
+    df = query_mirror(query)
+
+    options = df.to_dict(orient='records')[0]
+    options['opportunity_tiers'] = list(options['opportunity_tiers'])
+
+    return options
+
+@st.cache_data(ttl=3600)
+def load_metric_stats():
+    """Load the (min, max) of each metric column across the whole mart in one pass"""
+    aggregates = ',\n        '.join(
+        f"MIN({col}) as {col}_min, MAX({col}) as {col}_max" for col in METRIC_COLUMNS
+    )
+    query = f"""
+    SELECT
+        {aggregates}
+    FROM mart_gym_accessibility
+    """
+
+    row = query_mirror(query).to_dict(orient='records')[0]
+
+    return {col: (row[f'{col}_min'], row[f'{col}_max']) for col in METRIC_COLUMNS}
+
+@st.cache_data(ttl=3600)
+def load_color_bounds():
+    """Load the opportunity score percentiles that bound its map color scale"""
+    # Use the 5th and 95th percentiles so outliers don't dominate the color scale
+    query = """
+    SELECT
+        QUANTILE_CONT(opportunity_score, 0.05) as opportunity_score_p05,
+        QUANTILE_CONT(opportunity_score, 0.95) as opportunity_score_p95
+    FROM mart_gym_accessibility
+    """
+
+    return query_mirror(query).to_dict(orient='records')[0]
+
+@st.cache_data(ttl=3600)
+def load_summary_metrics(tiers, min_pop, max_dist, exclude_water):
+    """Aggregate the headline metrics for the filtered census blocks"""
+    where_clause, params = build_filter_clause(tiers, min_pop, max_dist, exclude_water)
+    query = f"""
+    SELECT
+        COUNT(*) as census_blocks,
+        COALESCE(SUM(total_population), 0) as total_population,
+        COALESCE(AVG(gyms_within_half_mile), 0) as avg_gyms_within_half_mile,
+        COUNT(*) FILTER (WHERE is_underserved) as underserved_blocks
+    FROM mart_gym_accessibility
+    {where_clause}
+    """
+
+    df = query_mirror(query, params)
+
+    return df.to_dict(orient='records')[0]
+
+@st.cache_data(ttl=3600)
+def load_distribution_summaries(tiers, min_pop, max_dist, exclude_water):
+    """Summarize the filtered census blocks by opportunity tier and by accessibility rating"""
+    where_clause, params = build_filter_clause(tiers, min_pop, max_dist, exclude_water)
+    # Both groupings come out of a single scan via GROUPING SETS
+    query = f"""
+    SELECT
+        opportunity_tier,
+        accessibility_rating,
+        GROUPING(opportunity_tier) as is_rating_group,
+        COUNT(*) as census_blocks,
+        SUM(total_population)::BIGINT as population,
+        ROUND(AVG(opportunity_score)) as avg_score
+    FROM mart_gym_accessibility
+    {where_clause}
+    GROUP BY GROUPING SETS ((opportunity_tier), (accessibility_rating))
+    """
+
+    df = query_mirror(query, params)
+    by_rating = df['is_rating_group'] == 1
+
+    tier_summary = df[~by_rating].set_index('opportunity_tier').sort_index()[
+        ['census_blocks', 'population', 'avg_score']
+    ]
+    tier_summary.columns = ['Census Blocks', 'Population', 'Avg Score']
+
+    access_summary = df[by_rating].set_index('accessibility_rating').sort_index()[
+        ['census_blocks', 'population']
+    ]
+    access_summary.columns = ['Census Blocks', 'Population']
+
+    return tier_summary, access_summary
+
+@st.cache_data(ttl=3600)
+def load_top_opportunities(tiers, min_pop, max_dist, exclude_water, limit=10):
+    """Load the highest-scoring census blocks that match the filters"""
+    where_clause, params = build_filter_clause(tiers, min_pop, max_dist, exclude_water)
+    params['limit'] = limit
+    query = f"""
+    SELECT
+        census_block_group,
+        total_population,
+        median_household_income,
+        gyms_within_half_mile,
+        distance_to_nearest_gym_miles,
+        opportunity_tier,
+        opportunity_score
+    FROM mart_gym_accessibility
+    {where_clause}
+    ORDER BY opportunity_score DESC
+    LIMIT $limit
+    """
+
+    return query_mirror(query, params)
+
+@st.cache_data(ttl=3600)
+def load_gym_data(tiers, min_pop, max_dist, exclude_water):
+    """Load gym accessibility data for the filtered census blocks"""
+    where_clause, params = build_filter_clause(tiers, min_pop, max_dist, exclude_water)
+    # Only select the columns the dashboard actually displays
+    query = f"""
+    SELECT
+        census_block_group,
+        total_population,
+        pop_age_18_54,
+        median_household_income,
+        gyms_within_1_mile,
+        gyms_within_half_mile,
+        distance_to_nearest_gym_miles,
+        accessibility_rating,
+        is_underserved,
+        opportunity_score,
+        opportunity_tier
+    FROM mart_gym_accessibility
+    {where_clause}
+    """
+
+    df = query_mirror(query, params)
+
+    # Shrink the frame once here so every cached copy and rerun uses the compact dtypes
+    for col in ['opportunity_tier', 'accessibility_rating']:
+        df[col] = df[col].astype('category')
+    # Scores and distances stay float64 - they are displayed and exported as-is
+    for col in ['total_population', 'gyms_within_1_mile', 'gyms_within_half_mile']:
+        df[col] = pd.to_numeric(df[col], downcast='unsigned')
+
+    # Sort locally rather than paying for an ORDER BY in the query
+    df = df.sort_values('opportunity_score', ascending=False, ignore_index=True)
+
+    # Format the popups once here so map rebuilds don't redo it for every block
+    df['popup_html'] = [POPUP_TEMPLATE.format_map(row) for row in df.to_dict(orient='records')]
 
     return df
 
+@st.cache_resource(ttl=MIRROR_TTL_SECONDS)
+def load_block_geometries():
+    """Parse every census block's GeoJSON geometry once, keyed by census block group"""
+    # Cached as a shared resource so map rebuilds reuse the parsed dicts without copying them
+    df = query_mirror("SELECT census_block_group, geometry FROM mart_gym_accessibility")
+    return dict(zip(
+        df['census_block_group'].to_numpy(),
+        [orjson.loads(geometry) for geometry in df['geometry'].to_numpy()]
+    ))
+
 @st.cache_data(ttl=3600)
 def load_gym_locations():
     """Load individual gym locations"""
-    conn = get_snowflake_connection()
-
     query = """
     SELECT
         place_id,
         display_name,
         gym_type,
-        ST_X(geography) as longitude,
-        ST_Y(geography) as latitude
-    FROM LEAP_ANALYTICS.DEV_INTERMEDIATE.INT_SF_GYMS
+        longitude,
+        latitude
+    FROM int_sf_gyms
     """
 
-    df = pd.read_sql(query, conn)
-    # Don't close connection - it's cached and will be reused
-
-    # Snowflake returns columns in uppercase - convert to lowercase for consistency
-    df.columns = df.columns.str.lower()
-
-    return df
+    return query_mirror(query)
+
+def map_colors(colormap, values):
+    """Vectorized equivalent of calling a LinearColormap on every value"""
+    values = np.asarray(values, dtype=float)
+    stops = np.asarray(colormap.index, dtype=float)
+    colors = np.asarray(colormap.colors, dtype=float)
+
+    # Interpolate each RGBA channel between the colormap stops, clamped to the ends
+    rgba = np.column_stack([np.interp(values, stops, colors[:, j]) for j in range(4)])
+    rgba[values <= stops[0]] = colors[0]
+
+    # Pack into 0xRRGGBBAA integers, rounding the same way branca does
+    channels = (rgba * 255.9999).astype(np.int64)
+    packed = (channels[:, 0] << 24) | (channels[:, 1] << 16) | (channels[:, 2] << 8) | channels[:, 3]
+    return np.char.mod('#%08x', packed).tolist()
+
+@st.cache_resource(ttl=MIRROR_TTL_SECONDS, max_entries=32)
+def build_block_features(_df, filters):
+    """Build the metric-independent GeoJSON features for the filtered census blocks"""
+    # Shared read-only across map builds, so changing the metric only recomputes fill colors
+    geometries = load_block_geometries()
+    return [
+        {
+            "type": "Feature",
+            "id": row.census_block_group,
+            "geometry": geometries[row.census_block_group],
+            "properties": {
+                "census_block_group": row.census_block_group,
+                "opportunity_tier": row.opportunity_tier,
+                "popup_html": row.popup_html,
+            },
+        }
+        for row in _df.itertuples(index=False)
+    ]
 
-def create_choropleth_map(df, metric='opportunity_score', show_gyms=True):
+def create_choropleth_map(df, filters, metric='opportunity_score', show_gyms=True):
     """Create a Folium choropleth map"""
 
     # San Francisco center
     sf_center = [37.7749, -122.4194]
 
-    # Create base map
+    # Create base map with a single basemap tile layer, kept out of the layer control
     m = folium.Map(
         location=sf_center,
         zoom_start=12,
-        tiles='CartoDB positron'
+        tiles=None
     )
+    folium.TileLayer('CartoDB positron', control=False).add_to(m)
 
-    # Define color scales for different metrics
-    # For opportunity score, use percentile-based scaling to avoid outliers dominating the color scale
-    if metric == 'opportunity_score':
-        # Use 5th and 95th percentile for better color distribution
-        vmin_score = df[metric].quantile(0.05)
-        vmax_score = df[metric].quantile(0.95)
-    else:
-        vmin_score = df[metric].min()
-        vmax_score = df[metric].max()
+    # Define color scales for different metrics, bounded by the precomputed mart-wide values
+    bounds = load_color_bounds()
+    metric_stats = load_metric_stats()
 
     color_scales = {
         'opportunity_score': {
             'colormap': LinearColormap(['red', 'orange', 'yellow', 'lightgreen', 'green'],
-                                      vmin=vmin_score,
-                                      vmax=vmax_score),
+                                      vmin=bounds['opportunity_score_p05'],
+                                      vmax=bounds['opportunity_score_p95']),
             'caption': 'Opportunity Score (Green = High Opportunity)'
         },
         'gyms_within_half_mile': {
             'colormap': LinearColormap(['red', 'orange', 'yellow', 'green'],
                                       vmin=0,
-                                      vmax=df[metric].max()),
+                                      vmax=metric_stats['gyms_within_half_mile'][1]),
             'caption': 'Gyms within 0.5 miles (Green = More Gyms)'
         },
         'distance_to_nearest_gym_miles': {
             'colormap': LinearColormap(['green', 'yellow', 'orange', 'red'],
                                       vmin=0,
-                                      vmax=df[metric].max()),
+                                      vmax=metric_stats['distance_to_nearest_gym_miles'][1]),
             'caption': 'Distance to Nearest Gym (Red = Farther)'
         }
     }
@@ -158,73 +475,54 @@ def create_choropleth_map(df, metric='opportunity_score', show_gyms=True):
     colormap = color_scales.get(metric, color_scales['opportunity_score'])['colormap']
     caption = color_scales.get(metric, color_scales['opportunity_score'])['caption']
 
-    # Add census blocks as polygons
-    for idx, row in df.iterrows():
-        # Parse GeoJSON geometry
-        geom = json.loads(row['geometry'])
-
-        # Get coordinates (handle both Polygon and MultiPolygon)
-        if geom['type'] == 'Polygon':
-            coords = geom['coordinates'][0]
-        else:  # MultiPolygon
-            coords = geom['coordinates'][0][0]
-
-        # Convert to lat/lon format (swap order)
-        coords = [[lat, lon] for lon, lat in coords]
-
-        # Determine color based on metric value
-        color = colormap(row[metric])
-
-        # Create popup content
-        popup_html = f"""
-        <div style="font-family: Arial; width: 250px;">
-            <h4>Census Block: {row['census_block_group']}</h4>
-            <hr>
-            <b>Opportunity Tier:</b> {row['opportunity_tier']}<br>
-            <b>Population:</b> {row['total_population']:,.0f}<br>
-            <b>Gyms (0.5mi):</b> {row['gyms_within_half_mile']}<br>
-            <b>Gyms (1mi):</b> {row['gyms_within_1_mile']}<br>
-            <b>Nearest Gym:</b> {row['distance_to_nearest_gym_miles']:.2f} miles<br>
-            <b>Accessibility:</b> {row['accessibility_rating']}<br>
-            <hr>
-            <b>Median Income:</b> ${row['median_household_income']:,.0f}<br>
-            <b>Working Age Pop:</b> {row['pop_age_18_54']:,.0f}<br>
-            <b>Opportunity Score:</b> {row['opportunity_score']:,.0f}
-        </div>
-        """
-
-        # Add polygon to map
-        folium.Polygon(
-            locations=coords,
-            color='gray',
-            weight=1,
-            fill=True,
-            fill_color=color,
-            fill_opacity=0.6,
-            popup=folium.Popup(popup_html, max_width=300),
-            tooltip=f"CBG: {row['census_block_group']} | {row['opportunity_tier']}"
-        ).add_to(m)
+    # Map every block's metric value to a fill color in one vectorized pass
+    fill_colors = dict(zip(
+        df['census_block_group'].to_numpy(),
+        map_colors(colormap, df[metric].to_numpy())
+    ))
+
+    # Add census blocks as one GeoJSON layer, styled client-side by Leaflet
+    folium.GeoJson(
+        {"type": "FeatureCollection", "features": build_block_features(df, filters)},
+        name='Census Blocks',
+        style_function=lambda feature: {
+            'color': 'gray',
+            'weight': 1,
+            'fillColor': fill_colors[feature['id']],
+            'fillOpacity': 0.6
+        },
+        tooltip=folium.GeoJsonTooltip(
+            fields=['census_block_group', 'opportunity_tier'],
+            aliases=['CBG:', 'Tier:']
+        ),
+        popup=folium.GeoJsonPopup(fields=['popup_html'], labels=False, max_width=300)
+    ).add_to(m)
 
     # Add gym locations if requested
     if show_gyms:
         gym_df = load_gym_locations()
 
-        # Create a feature group for gyms
-        gym_group = folium.FeatureGroup(name='Gym Locations')
-
-        for idx, gym in gym_df.iterrows():
-            folium.CircleMarker(
-                location=[gym['latitude'], gym['longitude']],
-                radius=4,
-                color='blue',
-                fill=True,
-                fill_color='blue',
-                fill_opacity=0.7,
-                popup=f"<b>{gym['display_name']}</b><br>Type: {gym['gym_type']}",
-                tooltip=gym['display_name']
-            ).add_to(gym_group)
+        # Build each gym marker client-side from a single data array
+        gym_marker_callback = """
+        function (row) {
+            var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+                radius: 4,
+                color: 'blue',
+                fill: true,
+                fillColor: 'blue',
+                fillOpacity: 0.7
+            });
+            marker.bindPopup('<b>' + row[2] + '</b><br>Type: ' + row[3]);
+            marker.bindTooltip(row[2]);
+            return marker;
+        }
+        """
 
-        gym_group.add_to(m)
+        plugins.FastMarkerCluster(
+            gym_df[['latitude', 'longitude', 'display_name', 'gym_type']].to_numpy(),
+            callback=gym_marker_callback,
+            name='Gym Locations'
+        ).add_to(m)
 
     # Add layer control
     folium.LayerControl().add_to(m)
@@ -235,9 +533,17 @@ def create_choropleth_map(df, metric='opportunity_score', show_gyms=True):
 
     return m
 
-# Load data
-with st.spinner("Loading data from Snowflake..."):
-    df = load_gym_data()
+@st.cache_data(ttl=3600, max_entries=32)
+def build_map_html(_df, filters, metric, show_gyms):
+    """Render the choropleth map to HTML, cached per filter state and map options"""
+    # The filtered frame is fully determined by `filters`, so skip hashing it
+    m = create_choropleth_map(_df, filters, metric=metric, show_gyms=show_gyms)
+    return m.get_root().render()
+
+# Load filter options and metric ranges - the first query refreshes the mirror from Snowflake if it is stale
+with st.spinner("Loading data (refreshing from Snowflake if needed)..."):
+    filter_options = load_filter_options()
+    metric_stats = load_metric_stats()
 
 # Sidebar filters
 st.sidebar.header("Filters")
@@ -249,19 +555,16 @@ exclude_water_blocks = st.sidebar.checkbox(
     help="Removes 2 census blocks that extend far into the bay/ocean"
 )
 
-# List of census blocks that extend into water (identified by abnormally large area)
-WATER_OVERLAPPING_BLOCKS = ['060750179021', '060750601001']
-
 opportunity_tiers = st.sidebar.multiselect(
     "Opportunity Tier",
-    options=df['opportunity_tier'].unique(),
-    default=df['opportunity_tier'].unique().tolist()  # Show all tiers by default
+    options=filter_options['opportunity_tiers'],
+    default=filter_options['opportunity_tiers']  # Show all tiers by default
 )
 
 min_population = st.sidebar.slider(
     "Minimum Population",
     min_value=0,
-    max_value=int(df['total_population'].max()),
+    max_value=int(metric_stats['total_population'][1]),
     value=0,
     step=100
 )
@@ -269,8 +572,8 @@ min_population = st.sidebar.slider(
 max_distance = st.sidebar.slider(
     "Max Distance to Nearest Gym (miles)",
     min_value=0.0,
-    max_value=float(df['distance_to_nearest_gym_miles'].max()),
-    value=float(df['distance_to_nearest_gym_miles'].max()),
+    max_value=float(metric_stats['distance_to_nearest_gym_miles'][1]),
+    value=float(metric_stats['distance_to_nearest_gym_miles'][1]),
     step=0.1
 )
 
@@ -291,18 +594,12 @@ selected_metric = metric_options[selected_metric_display]
 
 show_gyms = st.sidebar.checkbox("Show Gym Locations", value=True)
 
-# Apply filters
-filter_conditions = (
-    (df['opportunity_tier'].isin(opportunity_tiers)) &
-    (df['total_population'] >= min_population) &
-    (df['distance_to_nearest_gym_miles'] <= max_distance)
-)
-
-# Optionally exclude water-overlapping blocks
-if exclude_water_blocks:
-    filter_conditions = filter_conditions & (~df['census_block_group'].isin(WATER_OVERLAPPING_BLOCKS))
+# Apply filters against the local DuckDB mirror
+filters = (tuple(opportunity_tiers), min_population, max_distance, exclude_water_blocks)
 
-filtered_df = df[filter_conditions]
+with st.spinner("Filtering data..."):
+    filtered_df = load_gym_data(*filters)
+    summary = load_summary_metrics(*filters)
 
 # Summary metrics
 col1, col2, col3, col4 = st.columns(4)
@@ -310,42 +607,49 @@ col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.metric(
         "Total Census Blocks",
-        f"{len(filtered_df):,}",
-        delta=f"{len(filtered_df) - len(df):,} filtered"
+        f"{summary['census_blocks']:,}",
+        delta=f"{summary['census_blocks'] - filter_options['total_census_blocks']:,} filtered"
     )
 
 with col2:
     st.metric(
         "Total Population",
-        f"{filtered_df['total_population'].sum():,.0f}"
+        f"{summary['total_population']:,.0f}"
     )
 
 with col3:
     st.metric(
         "Avg Gyms (0.5mi)",
-        f"{filtered_df['gyms_within_half_mile'].mean():.1f}"
+        f"{summary['avg_gyms_within_half_mile']:.1f}"
     )
 
 with col4:
     st.metric(
         "Underserved Blocks",
-        f"{filtered_df['is_underserved'].sum():,}"
+        f"{summary['underserved_blocks']:,}"
     )
 
-# Create tabs
-tab1, tab2, tab3 = st.tabs(["🗺️ Map", "📊 Data Table", "📈 Analytics"])
+# Create tabs - st.tabs runs every tab body on each rerun, so a radio selects
+# the active tab and only that tab's content is computed
+active_tab = st.radio(
+    "View",
+    options=["🗺️ Map", "📊 Data Table", "📈 Analytics"],
+    horizontal=True,
+    key="active_tab",
+    label_visibility="collapsed"
+)
 
-with tab1:
+if active_tab == "🗺️ Map":
     st.subheader("Gym Accessibility Choropleth Map")
 
     if len(filtered_df) > 0:
-        # Create and display map
-        m = create_choropleth_map(filtered_df, metric=selected_metric, show_gyms=show_gyms)
-        st_folium(m, width=1400, height=600, key="gym_map", returned_objects=[])
+        # Create and display map - no interaction results are read back, so plain HTML is enough
+        map_html = build_map_html(filtered_df, filters, selected_metric, show_gyms)
+        components.html(map_html, height=600)
     else:
         st.warning("No data matches the current filters. Please adjust your selections.")
 
-with tab2:
+elif active_tab == "📊 Data Table":
     st.subheader("Filtered Data")
 
     # Display data table
@@ -377,36 +681,23 @@ with tab2:
         mime="text/csv"
     )
 
-with tab3:
+elif active_tab == "📈 Analytics":
     st.subheader("Opportunity Analysis")
 
+    tier_summary, access_summary = load_distribution_summaries(*filters)
+
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown("#### Opportunity Tier Distribution")
-        tier_summary = filtered_df.groupby('opportunity_tier').agg({
-            'census_block_group': 'count',
-            'total_population': 'sum',
-            'opportunity_score': 'mean'
-        }).round(0)
-        tier_summary.columns = ['Census Blocks', 'Population', 'Avg Score']
         st.dataframe(tier_summary, use_container_width=True)
 
     with col2:
         st.markdown("#### Accessibility Rating Distribution")
-        access_summary = filtered_df.groupby('accessibility_rating').agg({
-            'census_block_group': 'count',
-            'total_population': 'sum'
-        }).round(0)
-        access_summary.columns = ['Census Blocks', 'Population']
         st.dataframe(access_summary, use_container_width=True)
 
     st.markdown("#### Top 10 Opportunities")
-    top_10 = filtered_df.nlargest(10, 'opportunity_score')[[
-        'census_block_group', 'total_population', 'median_household_income',
-        'gyms_within_half_mile', 'distance_to_nearest_gym_miles',
-        'opportunity_tier', 'opportunity_score'
-    ]]
+    top_10 = load_top_opportunities(*filters)
     st.dataframe(top_10, use_container_width=True)
 
 # Footer